@@ -1,9 +1,10 @@
-import os
-import concurrent.futures
+import asyncio
 import streamlit as st
 from backend.ingestion import process_file
-from backend.classification import classify_document
-from backend.storage import save_result, load_history
+from backend.classification import a_classify_document
+from backend.llm_client import async_session
+from backend.storage import save_result, load_history, clear_history, flush_history
+from backend.config import MAX_PARALLEL_FILES
 
 # ----------------------------------------------------------------------
 # BASIC PAGE CONFIG
@@ -32,8 +33,18 @@ st.markdown(
 if "results" not in st.session_state:
     st.session_state["results"] = []
 
-# 🔹 History path at project root (same file backend.storage writes to)
-HISTORY_PATH = os.path.join(os.path.dirname(__file__), "history.json")
+
+@st.cache_data(ttl=30)
+def _cached_history():
+    """Audit trail + its DataFrame, reused across reruns until a save/clear."""
+    history = load_history()
+    if not history:
+        return history, None
+
+    import pandas as pd
+
+    return history, pd.DataFrame(history)
+
 
 # ----------------------------------------------------------------------
 # SIDEBAR NAVIGATION
@@ -70,44 +81,56 @@ if page == "Upload & Analyze":
     if run_clicked and uploaded_files:
         st.info(f"{len(uploaded_files)} file(s) selected.")
         progress = st.progress(0.0)
-        status_placeholder = st.empty()
-        results = []
-
-        def process_single(uploaded_file):
-            """Ingest + classify a single file (used in threads)."""
-            doc_info = process_file(uploaded_file)
-            ai_result = classify_document(doc_info)
-            return {
+        results_by_index = {}
+
+        async def process_single(index, uploaded_file, slots):
+            """Ingest + classify a single file; LLM calls overlap on the event loop."""
+            async with slots:
+                try:
+                    # PDF parsing / OCR is blocking, so it runs in a worker thread
+                    doc_info = await asyncio.to_thread(process_file, uploaded_file)
+                    ai_result = await a_classify_document(doc_info)
+                except Exception as e:
+                    return index, None, e
+            return index, {
                 "filename": uploaded_file.name,
                 "doc_info": doc_info,
                 "ai_result": ai_result,
-            }
+            }, None
 
         total = len(uploaded_files)
-        done = 0
-
-        # Run all docs concurrently (good for I/O + network-bound LLM calls)
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=min(4, total)
-        ) as executor:
-            future_to_file = {
-                executor.submit(process_single, f): f for f in uploaded_files
-            }
-            for future in concurrent.futures.as_completed(future_to_file):
-                f = future_to_file[future]
-                try:
-                    result = future.result()
-                    results.append(result)
+
+        async def run_all(status):
+            done = 0
+            # One HTTP/2 client + request semaphore shared by every file
+            async with async_session():
+                slots = asyncio.Semaphore(MAX_PARALLEL_FILES)
+                tasks = [
+                    process_single(i, f, slots) for i, f in enumerate(uploaded_files)
+                ]
+                for next_done in asyncio.as_completed(tasks):
+                    i, result, error = await next_done
+                    f = uploaded_files[i]
+                    if error is not None:
+                        st.error(f"Error processing {f.name}: {error}")
+                        continue
+                    results_by_index[i] = result
                     done += 1
                     progress.progress(done / total)
-                    status_placeholder.write(f"Finished: {f.name}")
-                except Exception as e:
-                    st.error(f"Error processing {f.name}: {e}")
+                    status.write(f"Finished: {f.name}")
+
+        # Run all docs concurrently (good for I/O + network-bound LLM calls);
+        # OpenRouter concurrency is capped separately inside llm_client.
+        with st.status(f"Processing {total} file(s)...", expanded=False) as status:
+            asyncio.run(run_all(status))
+            status.update(label="All files processed.", state="complete")
 
         progress.empty()
-        status_placeholder.empty()
         st.success("All files processed.")
 
+        # Keep the upload order regardless of which file finished first
+        results = [results_by_index[i] for i in sorted(results_by_index)]
+
         # 🔴 Persist results so they survive reruns / widget interactions
         st.session_state["results"] = results
 
@@ -206,11 +229,14 @@ if page == "Upload & Analyze":
                         final_category=final_category,
                         reviewer_comment=reviewer_comment.strip(),
                     )
-                    st.success(f"Review for '{filename}' saved to history.json.")
+                    # Wait for the audit log write so a failure is reported below
+                    flush_history()
+                    _cached_history.clear()
+                    st.success(f"Review for '{filename}' saved to history.jsonl.")
                 except Exception as e:
                     st.error(f"Could not save review for {filename}: {e}")
 
-        # Optional: button to clear current session results (not history.json)
+        # Optional: button to clear current session results (not history.jsonl)
         if st.button("Clear current results"):
             st.session_state["results"] = []
             st.rerun()
@@ -221,18 +247,18 @@ if page == "Upload & Analyze":
 elif page == "History & Audit":
     st.title("History & Audit Trail")
 
-    history = load_history()
+    history, df = _cached_history()
 
     # Simple clear-history button (no dropdown/expander)
     st.markdown("#### Clear audit history")
     st.caption(
         "This will permanently delete all entries from the audit trail "
-        "(history.json in the project root) and cannot be undone."
+        "(history.jsonl in the project root) and cannot be undone."
     )
     if st.button("Clear ALL history"):
         try:
-            if os.path.exists(HISTORY_PATH):
-                os.remove(HISTORY_PATH)
+            clear_history()
+            _cached_history.clear()
             st.success("Audit history cleared.")
             st.rerun()
         except Exception as e:
@@ -244,10 +270,6 @@ elif page == "History & Audit":
             "and click 'Save Review'."
         )
     else:
-        import pandas as pd
-
-        df = pd.DataFrame(history)
-
         st.subheader("Processed Documents")
         df_sorted = df.sort_values("timestamp", ascending=False)
 
@@ -1,12 +1,18 @@
+import asyncio
 import json
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
+import orjson
+
+from .config import RULES_FAST_PATH, SPECULATIVE_VALIDATOR
 from .pii_detection import find_pii
-from .safety import naive_unsafe_check, profanity_pages, sensitive_equipment_pages
-from .llm_client import call_openrouter_chat
+from .prompt_budget import fit_page_summaries
+from .safety import classify_pages
+from .llm_client import a_call_openrouter_chat, call_openrouter_chat
+from .semantic_cache import build_embed_texts, get_semantic_cache
 
 # === Prompt library paths ===
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
@@ -26,6 +32,7 @@ def load_prompt_config() -> Dict[str, Any]:
         return {"default": ["base_classification.txt"]}
 
 
+@lru_cache(maxsize=8)
 def load_prompt_template(filename: str) -> str:
     path = os.path.join(PROMPTS_DIR, filename)
     with open(path, "r", encoding="utf-8") as f:
@@ -33,14 +40,19 @@ def load_prompt_template(filename: str) -> str:
 
 
 def build_system_prompt(context_flags: Dict[str, bool]) -> str:
-    cfg = load_prompt_config()
     if context_flags.get("unsafe_keyword_flag"):
         key = "unsafe"
     elif context_flags.get("has_ssn") or context_flags.get("has_pii"):
         key = "sensitive"
     else:
         key = "public"
+    return _assemble_system_prompt(key)
 
+
+@lru_cache(maxsize=8)
+def _assemble_system_prompt(key: str) -> str:
+    """Concatenate the templates for one prompt-config key (cached per key)."""
+    cfg = load_prompt_config()
     template_list = cfg.get(key, cfg.get("default", ["base_classification.txt"]))
     pieces: List[str] = []
     for fname in template_list:
@@ -53,18 +65,7 @@ def build_system_prompt(context_flags: Dict[str, bool]) -> str:
     return "\n\n".join(pieces)
 
 
-def run_llm_classification(payload: Dict[str, Any], model: str, system_prompt: str) -> Dict[str, Any]:
-    user_prompt = json.dumps(payload, ensure_ascii=False)
-    print(f"[LLM] Calling OpenRouter model={model}")
-
-    llm_raw = call_openrouter_chat(
-        model=model,
-        system_prompt=system_prompt,
-        user_prompt=user_prompt,
-        response_format_json=True,
-        temperature=0.1,
-    )
-
+def _normalize_llm_output(llm_raw: Dict[str, Any]) -> Dict[str, Any]:
     category = llm_raw.get("category", "Public")
     unsafe = bool(llm_raw.get("unsafe", False))
     kid_safe = bool(llm_raw.get("kid_safe", not unsafe))
@@ -86,70 +87,35 @@ def run_llm_classification(payload: Dict[str, Any], model: str, system_prompt: s
     }
 
 
-# ---------------------------------------------------------------------------
-# Helper: detect internal/template/equipment keywords (policy rules)
-# ---------------------------------------------------------------------------
-def detect_policy_keywords(text: str) -> Dict[str, bool]:
-    low = text.lower()
+def _chat_request(payload: Dict[str, Any], model: str, system_prompt: str) -> Dict[str, Any]:
+    """Keyword arguments for call_openrouter_chat / a_call_openrouter_chat."""
+    print(f"[LLM] Calling OpenRouter model={model}")
     return {
-        "internal": bool(re.search(r"\b(internal use|restricted circulation|proposal|confidential memo|research)\b", low)),
-        "template": bool(re.search(r"\b(template|editable|shared)\b", low)),
-        "equipment": bool(re.search(r"(fighter|aircraft|drone|missile|f-\d+|serial\s?(no\.|number|#))", low)),
+        "model": model,
+        "system_prompt": system_prompt,
+        "user_prompt": orjson.dumps(payload).decode("utf-8"),
+        "response_format_json": True,
+        "temperature": 0.1,
     }
 
 
-# ---------------------------------------------------------------------------
-# Main classification orchestrator
-# ---------------------------------------------------------------------------
-def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
-    pages = doc_info["pages"]
-    num_pages = doc_info["num_pages"]
-    num_images = doc_info["num_images"]
-
-    # === Heuristic extraction ===
-    pii_raw = find_pii(pages)
-    pii = [f for f in pii_raw if not (f.get("type") == "email" and f.get("is_business"))]
-
-    unsafe_flag_heuristic = naive_unsafe_check(pages)
-    prof_pages = profanity_pages(pages)
-    has_ssn = any(f["type"] == "ssn" for f in pii)
-    has_pii = bool(pii)
-    equipment_pages = sensitive_equipment_pages(pages)
-    has_sensitive_equipment = bool(equipment_pages) and num_images > 0
-
-    # === Dynamic system prompt ===
-    context_flags = {
-        "unsafe_keyword_flag": unsafe_flag_heuristic,
-        "has_ssn": has_ssn,
-        "has_pii": has_pii,
-    }
-    system_prompt = build_system_prompt(context_flags)
-
-    # === Summaries ===
-    page_summaries: List[Dict[str, Any]] = []
-    for p in pages:
-        text = (p.get("text") or "").strip()
-        if len(text) > 800:
-            text = text[:800] + "..."
-        page_summaries.append({"page": p["page_num"], "text": text})
+def run_llm_classification(payload: Dict[str, Any], model: str, system_prompt: str) -> Dict[str, Any]:
+    llm_raw = call_openrouter_chat(**_chat_request(payload, model, system_prompt))
+    return _normalize_llm_output(llm_raw)
 
-    user_payload = {
-        "num_pages": num_pages,
-        "num_images": num_images,
-        "pii_findings": pii,
-        "unsafe_keyword_flag": unsafe_flag_heuristic,
-        "profanity_pages": prof_pages,
-        "page_summaries": page_summaries,
-    }
 
-    # === 1) Primary LLM ===
-    primary = run_llm_classification(user_payload, PRIMARY_MODEL, system_prompt)
+async def a_run_llm_classification(
+    payload: Dict[str, Any], model: str, system_prompt: str
+) -> Dict[str, Any]:
+    """Async twin of run_llm_classification."""
+    llm_raw = await a_call_openrouter_chat(**_chat_request(payload, model, system_prompt))
+    return _normalize_llm_output(llm_raw)
 
-    # === 2) Optional validator ===
-    validator: Optional[Dict[str, Any]] = None
-    if primary["confidence"] < VALIDATION_THRESHOLD:
-        validator = run_llm_classification(user_payload, VALIDATOR_MODEL, system_prompt)
 
+def _merge_validator(
+    primary: Dict[str, Any], validator: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Primary verdict, replaced by the validator's when the two disagree."""
     category = primary["category"]
     unsafe_flag_llm = primary["unsafe"]
     kid_safe = primary["kid_safe"]
@@ -176,6 +142,333 @@ def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
             )
             citations += (validator.get("citations") or [])
 
+    return {
+        "category": category,
+        "unsafe": unsafe_flag_llm,
+        "kid_safe": kid_safe,
+        "confidence": confidence,
+        "reasoning": reasoning,
+        "citations": citations,
+    }
+
+
+def _needs_validator(primary: Dict[str, Any], use_validator: bool) -> bool:
+    return use_validator and primary["confidence"] < VALIDATION_THRESHOLD
+
+
+def run_llm_stage(
+    user_payload: Dict[str, Any], system_prompt: str, use_validator: bool = True
+) -> Dict[str, Any]:
+    """Primary model, plus the validator when the primary is unsure.
+
+    With SPECULATIVE_VALIDATOR the validator is started alongside the primary,
+    so a low-confidence document waits max(primary, validator) instead of the
+    sum. A confident primary discards the validator's result, but the request
+    has already been sent and paid for (off by default; see config).
+    use_validator=False skips the validator entirely (primary only).
+    """
+    if not (use_validator and SPECULATIVE_VALIDATOR):
+        # === 1) Primary LLM ===
+        primary = run_llm_classification(user_payload, PRIMARY_MODEL, system_prompt)
+
+        # === 2) Optional validator ===
+        validator: Optional[Dict[str, Any]] = None
+        if _needs_validator(primary, use_validator):
+            validator = run_llm_classification(user_payload, VALIDATOR_MODEL, system_prompt)
+        return _merge_validator(primary, validator)
+
+    # Speculative: primary and validator in flight together
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_future = executor.submit(
+            run_llm_classification, user_payload, PRIMARY_MODEL, system_prompt
+        )
+        validator_future = executor.submit(
+            run_llm_classification, user_payload, VALIDATOR_MODEL, system_prompt
+        )
+        primary = primary_future.result()
+
+        validator = None
+        if _needs_validator(primary, use_validator):
+            validator = validator_future.result()
+        else:
+            validator_future.cancel()
+    finally:
+        # Don't block on a discarded validator; if it is already in flight it
+        # finishes in the background (and still warms the response cache).
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return _merge_validator(primary, validator)
+
+
+async def a_run_llm_stage(
+    user_payload: Dict[str, Any], system_prompt: str, use_validator: bool = True
+) -> Dict[str, Any]:
+    """Async twin of run_llm_stage; a discarded validator request is cancelled."""
+    # === 1) Primary LLM ===
+    primary_task = asyncio.create_task(
+        a_run_llm_classification(user_payload, PRIMARY_MODEL, system_prompt)
+    )
+    validator_task = None
+    if use_validator and SPECULATIVE_VALIDATOR:
+        validator_task = asyncio.create_task(
+            a_run_llm_classification(user_payload, VALIDATOR_MODEL, system_prompt)
+        )
+
+    try:
+        primary = await primary_task
+
+        # === 2) Optional validator ===
+        validator: Optional[Dict[str, Any]] = None
+        if _needs_validator(primary, use_validator):
+            if validator_task is not None:
+                validator = await validator_task
+            else:
+                validator = await a_run_llm_classification(
+                    user_payload, VALIDATOR_MODEL, system_prompt
+                )
+    finally:
+        if validator_task is not None and not validator_task.done():
+            validator_task.cancel()
+
+    return _merge_validator(primary, validator)
+
+
+# ---------------------------------------------------------------------------
+# Helper: detect internal/template/equipment keywords (policy rules)
+# ---------------------------------------------------------------------------
+def detect_policy_keywords(text: str) -> Dict[str, bool]:
+    return classify_pages([{"page_num": 1, "text": text, "text_lower": text.lower()}])["policies"]
+
+
+# ---------------------------------------------------------------------------
+# Rules-first fast path: decide without the LLM when heuristics are enough
+# ---------------------------------------------------------------------------
+def deterministic_verdict(
+    pages: List[Dict[str, Any]],
+    num_images: int,
+    pii: List[Dict[str, Any]],
+    has_ssn: bool,
+    unsafe_flag_heuristic: bool,
+    prof_pages: List[int],
+    scan: Dict[str, Any],
+    has_sensitive_equipment: bool,
+) -> Optional[Dict[str, Any]]:
+    """LLM-shaped verdict when the rules alone are conclusive, else None.
+
+    Only fires when no policy wording (internal / template / equipment) is
+    present, so the policy rules applied afterwards cannot contradict it.
+    """
+    policies = scan["policies"]
+    policy_signals = any(policies.values()) or has_sensitive_equipment
+
+    def verdict(category: str, unsafe: bool, confidence: float, why: str) -> Dict[str, Any]:
+        return {
+            "category": category,
+            "unsafe": unsafe,
+            "kid_safe": not unsafe and not prof_pages,
+            "confidence": confidence,
+            "reasoning": f"Deterministic rule: {why} (LLM not consulted).",
+            "citations": [],
+        }
+
+    if policy_signals:
+        return None
+
+    if has_ssn and not unsafe_flag_heuristic:
+        return verdict("Highly Sensitive", False, 0.95, "Social Security Number detected")
+
+    if unsafe_flag_heuristic and not scan["marketing"]:
+        return verdict("Unsafe", True, 0.9, "explicit unsafe phrase detected")
+
+    total_text = sum(len((p.get("text") or "").strip()) for p in pages)
+    if not pii and not prof_pages and not unsafe_flag_heuristic and num_images == 0 and total_text < 500:
+        return verdict("Public", False, 0.85, "short text-only document with no PII or policy wording")
+
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Main classification orchestrator
+# ---------------------------------------------------------------------------
+def _extract_signals(doc_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Heuristic (non-LLM) signals that drive prompts, fast path and policy rules."""
+    pages = doc_info["pages"]
+    num_images = doc_info["num_images"]
+
+    # === Heuristic extraction ===
+    business_contacts: List[Dict[str, Any]] = []
+    pii = find_pii(pages, suppress_business_emails=True, business_contacts=business_contacts)
+
+    # One keyword pass covers unsafe phrases, profanity, equipment and policy wording
+    scan = classify_pages(pages)
+
+    return {
+        "pages": pages,
+        "num_pages": doc_info["num_pages"],
+        "num_images": num_images,
+        "pii": pii,
+        "business_contacts": business_contacts,
+        "scan": scan,
+        "unsafe_flag_heuristic": scan["unsafe"],
+        "prof_pages": scan["profanity_pages"],
+        "has_ssn": any(f["type"] == "ssn" for f in pii),
+        "has_pii": bool(pii),
+        "has_sensitive_equipment": bool(scan["sensitive_pages"]) and num_images > 0,
+    }
+
+
+def _fast_path_verdict(signals: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not RULES_FAST_PATH:
+        return None
+    return deterministic_verdict(
+        signals["pages"], signals["num_images"], signals["pii"], signals["has_ssn"],
+        signals["unsafe_flag_heuristic"], signals["prof_pages"], signals["scan"],
+        signals["has_sensitive_equipment"],
+    )
+
+
+def _category_pinned(signals: Dict[str, Any]) -> bool:
+    """True when _apply_policy_rules fixes both the category and the unsafe
+    flag whatever the LLM says, so a validator opinion cannot change the result.
+
+    The unsafe keyword heuristic must fire (otherwise the LLM's unsafe bit is
+    load-bearing) and a rule must set the category outright.
+    """
+    if not signals["unsafe_flag_heuristic"]:
+        return False
+    scan = signals["scan"]
+    policies = scan["policies"]
+    not_marketing = not scan["marketing"]
+    return bool(
+        signals["has_ssn"]
+        or policies["internal"]
+        or ((signals["has_sensitive_equipment"] or policies["equipment"]) and not_marketing)
+        or (policies["template"] and scan["operational"] and not_marketing)
+    )
+
+
+def _build_llm_request(signals: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, bool]]:
+    """System prompt, user payload and context flags for the LLM stage."""
+    # === Dynamic system prompt ===
+    context_flags = {
+        "unsafe_keyword_flag": signals["unsafe_flag_heuristic"],
+        "has_ssn": signals["has_ssn"],
+        "has_pii": signals["has_pii"],
+    }
+    system_prompt = build_system_prompt(context_flags)
+
+    # === Summaries ===
+    page_summaries = fit_page_summaries(signals["pages"])
+
+    user_payload = {
+        "num_pages": signals["num_pages"],
+        "num_images": signals["num_images"],
+        "pii_findings": signals["pii"],
+        "unsafe_keyword_flag": signals["unsafe_flag_heuristic"],
+        "profanity_pages": signals["prof_pages"],
+        "page_summaries": page_summaries,
+    }
+    return system_prompt, user_payload, context_flags
+
+
+def _semantic_lookup(user_payload: Dict[str, Any], context_flags: Dict[str, bool]):
+    """(cache, query vector, cached verdict or None); cache is None when disabled."""
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is None:
+        return None, None, None
+    embed_vector = semantic_cache.embed(build_embed_texts(user_payload))
+    return semantic_cache, embed_vector, semantic_cache.search(embed_vector, context_flags)
+
+
+def _prepare_verdict(
+    doc_info: Dict[str, Any],
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Everything before the LLM call: (signals, verdict, llm_request).
+
+    The verdict comes from the deterministic rules or the semantic cache;
+    when neither applies it is None and llm_request holds what the LLM stage
+    (and _finish_verdict) needs.
+    """
+    signals = _extract_signals(doc_info)
+
+    # === Verdict: deterministic rules, else semantic cache, else LLM ===
+    llm_verdict = _fast_path_verdict(signals)
+    if llm_verdict is not None:
+        return signals, llm_verdict, None
+
+    system_prompt, user_payload, context_flags = _build_llm_request(signals)
+    semantic_cache, embed_vector, llm_verdict = _semantic_lookup(user_payload, context_flags)
+    if llm_verdict is not None:
+        return signals, llm_verdict, None
+
+    return signals, None, {
+        "user_payload": user_payload,
+        "system_prompt": system_prompt,
+        "use_validator": not _category_pinned(signals),
+        "context_flags": context_flags,
+        "semantic_cache": semantic_cache,
+        "embed_vector": embed_vector,
+    }
+
+
+def _finish_verdict(
+    signals: Dict[str, Any], llm_request: Dict[str, Any], llm_verdict: Dict[str, Any]
+) -> Dict[str, Any]:
+    # A primary-only verdict must not be reused where the validator would run
+    semantic_cache = llm_request["semantic_cache"]
+    if semantic_cache is not None and llm_request["use_validator"]:
+        semantic_cache.add(llm_request["embed_vector"], llm_request["context_flags"], llm_verdict)
+    return _apply_policy_rules(signals, llm_verdict)
+
+
+def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
+    signals, llm_verdict, llm_request = _prepare_verdict(doc_info)
+    if llm_request is None:
+        return _apply_policy_rules(signals, llm_verdict)
+
+    llm_verdict = run_llm_stage(
+        llm_request["user_payload"],
+        llm_request["system_prompt"],
+        use_validator=llm_request["use_validator"],
+    )
+    return _finish_verdict(signals, llm_request, llm_verdict)
+
+
+async def a_classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Async twin of classify_document (LLM calls overlap on the event loop).
+
+    The blocking parts (page scans, embedding, semantic cache I/O) run in
+    worker threads so other documents' requests keep moving meanwhile.
+    """
+    signals, llm_verdict, llm_request = await asyncio.to_thread(_prepare_verdict, doc_info)
+    if llm_request is None:
+        return _apply_policy_rules(signals, llm_verdict)
+
+    llm_verdict = await a_run_llm_stage(
+        llm_request["user_payload"],
+        llm_request["system_prompt"],
+        use_validator=llm_request["use_validator"],
+    )
+    return await asyncio.to_thread(_finish_verdict, signals, llm_request, llm_verdict)
+
+
+def _apply_policy_rules(signals: Dict[str, Any], llm_verdict: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the (LLM or rule) verdict with deterministic overrides and citations."""
+    pii = signals["pii"]
+    scan = signals["scan"]
+    policies = scan["policies"]
+    unsafe_flag_heuristic = signals["unsafe_flag_heuristic"]
+    prof_pages = signals["prof_pages"]
+    has_ssn = signals["has_ssn"]
+    has_sensitive_equipment = signals["has_sensitive_equipment"]
+
+    category = llm_verdict["category"]
+    unsafe_flag_llm = llm_verdict["unsafe"]
+    confidence = llm_verdict["confidence"]
+    reasoning = llm_verdict["reasoning"]
+    citations: List[Dict[str, Any]] = list(llm_verdict["citations"] or [])
+
         # === Merge with deterministic / policy rules ===
     unsafe_flag = unsafe_flag_llm or unsafe_flag_heuristic
 
@@ -188,19 +481,9 @@ def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
         category = "Highly Sensitive" if "Unsafe" not in category else "Highly Sensitive and Unsafe"
         confidence = max(confidence, 0.9)
 
-    # === Policy keyword detection (TC3–TC5) ===
-    full_text = " ".join(p.get("text", "") for p in pages)
-    policies = detect_policy_keywords(full_text)
-    text_lower = full_text.lower()
-
+    # === Policy keyword detection (TC3–TC5), from the single scan above ===
     # --- marketing/public-safe guard ---
-    is_marketing_or_public = any(
-        kw in text_lower
-        for kw in [
-            "brochure", "marketing", "customer story", "press release",
-            "product portfolio", "case study", "advertisement"
-        ]
-    )
+    is_marketing_or_public = scan["marketing"]
 
     # --- 1️⃣ Internal / restricted (TC3) ---
     if policies["internal"]:
@@ -224,7 +507,7 @@ def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
 
     # --- 3️⃣ Template / shared editable (TC5) ---
     elif policies["template"] and not is_marketing_or_public:
-        if any(k in text_lower for k in ["flight", "manual", "operations", "safety"]):
+        if scan["operational"]:
             category = "Confidential"
             confidence = max(confidence, 0.85)
             reasoning += (
@@ -256,7 +539,7 @@ def classify_document(doc_info: Dict[str, Any]) -> Dict[str, Any]:
         kid_safe_final = True
 
     # === Optional note for public business contact info ===
-    if not unsafe_flag and any(f.get("is_business") for f in pii_raw):
+    if not unsafe_flag and signals["business_contacts"]:
         reasoning += "\nNote: Detected only public business contact info — does not increase sensitivity."
 
     return {
@@ -1,4 +1,5 @@
 # backend/config.py
+import os
 
 CATEGORIES = ["Public", "Confidential", "Highly Sensitive", "Unsafe"]
 
@@ -7,3 +8,51 @@ CONFIDENCE_HITL_THRESHOLD = 0.85
 
 # Placeholder for model name / provider
 LLM_MODEL_NAME = "llama-vision-or-text-model"
+
+# Exact-match LLM response cache (SQLite file in project root)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 5000
+
+# Semantic cache over LLM verdicts (optional: sentence-transformers + faiss-cpu)
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_MODEL = "all-MiniLM-L6-v2"
+# Cosine similarity needed to reuse a verdict: 0.85 lenient, 0.95 strict
+SEMANTIC_CACHE_THRESHOLD = 0.90
+SEMANTIC_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "semantic_cache")
+
+# LLM concurrency
+# Max simultaneous OpenRouter requests per process (respects provider RPM limits)
+LLM_MAX_CONCURRENCY = 4
+# Fire the validator alongside the primary instead of after an unsure primary.
+# Cuts latency for low-confidence documents, but every LLM-classified document
+# then pays for a full validator (70B) completion and holds a second
+# LLM_MAX_CONCURRENCY slot: the sync path cannot cancel a request once sent.
+SPECULATIVE_VALIDATOR = False
+# Max uploaded files ingested + classified at once in the Streamlit app
+MAX_PARALLEL_FILES = 8
+
+# OpenRouter retries / timeouts
+LLM_MAX_RETRIES = 5
+LLM_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+LLM_BACKOFF_CAP_SECONDS = 32
+LLM_CONNECT_TIMEOUT = 5
+# Read timeouts: small models answer quickly, 70B cold starts can take minutes
+LLM_READ_TIMEOUT = 60
+LLM_READ_TIMEOUT_LARGE = 300
+# Pooled keep-alive connections to OpenRouter (HTTP/2)
+LLM_HTTP_MAX_CONNECTIONS = 16
+
+# Prompt size limits for page summaries
+PROMPT_MAX_TOKENS = 4000
+PROMPT_PAGE_CHAR_LIMIT = 800
+# Documents longer than this are skimmed (first 3, middle 3, last 2 pages)
+PROMPT_SKIM_PAGE_THRESHOLD = 50
+
+# Skip the LLM when deterministic rules alone decide the category
+RULES_FAST_PATH = True
+
+# Audit log writes are queued and coalesced by a background flusher
+HISTORY_FLUSH_INTERVAL_SECONDS = 0.25
+HISTORY_FLUSH_MAX_ENTRIES = 64
@@ -1,34 +1,50 @@
 # backend/ingestion.py
+import hashlib
 import io
 import os
-from typing import Dict, Any, List
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 import shutil
-import pdfplumber
-from PIL import Image
-import pytesseract
 
-# ---------- TESSERACT SETUP (Windows-friendly) ----------
+# PDF / imaging libraries are imported inside the functions that use them,
+# so app startup doesn't pay for them until the first upload.
 
-# Try to find tesseract.exe automatically
-_tess_cmd = shutil.which("tesseract")
+# Parsed documents keyed by (sha256, file kind), most recently used last
+PROCESSED_CACHE_SIZE = 16
+_PROCESSED: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_PROCESSED_LOCK = threading.Lock()
 
-if _tess_cmd is None:
-    # Common Windows install locations
-    candidate_paths = [
-        r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-        r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-    ]
-    for path in candidate_paths:
-        if os.path.exists(path):
-            _tess_cmd = path
-            break
+# ---------- TESSERACT SETUP (Windows-friendly) ----------
 
-if _tess_cmd:
-    pytesseract.pytesseract.tesseract_cmd = _tess_cmd
-    print(f"[OCR] Using Tesseract at: {_tess_cmd}")
-else:
-    # We won't crash here; _process_image will handle the missing binary
-    print("[OCR] WARNING: tesseract.exe not found. Image OCR will be unavailable.")
+@lru_cache(maxsize=1)
+def _configure_tesseract():
+    """Locate tesseract once (first OCR call) and return the pytesseract module."""
+    import pytesseract
+
+    # Try to find tesseract.exe automatically
+    tess_cmd = shutil.which("tesseract")
+
+    if tess_cmd is None:
+        # Common Windows install locations
+        candidate_paths = [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+        ]
+        for path in candidate_paths:
+            if os.path.exists(path):
+                tess_cmd = path
+                break
+
+    if tess_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tess_cmd
+        print(f"[OCR] Using Tesseract at: {tess_cmd}")
+    else:
+        # We won't crash here; _process_image will handle the missing binary
+        print("[OCR] WARNING: tesseract.exe not found. Image OCR will be unavailable.")
+
+    return pytesseract
 
 
 def _assess_legibility(texts: List[str]) -> bool:
@@ -41,6 +57,58 @@ def _assess_legibility(texts: List[str]) -> bool:
     return total_chars >= 30
 
 
+def _extract_pdf_pdfium(file_bytes: bytes) -> Tuple[List[str], int]:
+    """Per-page text and total image count via PDFium (native, fast)."""
+    import pypdfium2 as pdfium
+
+    page_texts: List[str] = []
+    num_images = 0
+
+    pdf = pdfium.PdfDocument(file_bytes)
+    try:
+        for page in pdf:
+            textpage = page.get_textpage()
+            text = textpage.get_text_range() or ""
+            textpage.close()
+            # PDFium uses CRLF line breaks; match pdfplumber's output
+            page_texts.append(text.replace("\r\n", "\n"))
+
+            num_images += sum(
+                1 for _ in page.get_objects(filter=[pdfium.raw.FPDF_PAGEOBJ_IMAGE])
+            )
+            page.close()
+    finally:
+        pdf.close()
+
+    return page_texts, num_images
+
+
+def _extract_pdf_pdfplumber(file_bytes: bytes) -> Tuple[List[str], int]:
+    """Per-page text and total image count via pdfplumber (slower fallback)."""
+    import pdfplumber
+
+    page_texts: List[str] = []
+    num_images = 0
+
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        for page in pdf.pages:
+            page_texts.append(page.extract_text() or "")
+
+            # pdfplumber exposes image metadata per page
+            num_images += len(page.images)
+
+    return page_texts, num_images
+
+
+def _make_page(page_num: int, text: str) -> Dict[str, Any]:
+    # Lowercased once here; every keyword scan downstream reads text_lower
+    return {
+        "page_num": page_num,
+        "text": text,
+        "text_lower": text.lower(),
+    }
+
+
 def _process_pdf(file_bytes: bytes) -> Dict[str, Any]:
     """Extract text & image counts from a PDF file.
 
@@ -50,29 +118,21 @@ def _process_pdf(file_bytes: bytes) -> Dict[str, Any]:
             "num_images": int,
             "legible": bool,
             "pages": [
-                {"page_num": int, "text": str},
+                {"page_num": int, "text": str, "text_lower": str},
                 ...
             ],
         }
     """
-    pages: List[Dict[str, Any]] = []
-    page_texts: List[str] = []
-    num_images = 0
-
-    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        for i, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text() or ""
-            page_texts.append(text)
-
-            # pdfplumber exposes image metadata per page
-            num_images += len(page.images)
-
-            pages.append(
-                {
-                    "page_num": i,
-                    "text": text,
-                }
-            )
+    try:
+        page_texts, num_images = _extract_pdf_pdfium(file_bytes)
+    except Exception as e:
+        # PDFium rejects some malformed files that pdfminer still reads
+        print(f"[PDF] pypdfium2 failed ({e}); falling back to pdfplumber.")
+        page_texts, num_images = _extract_pdf_pdfplumber(file_bytes)
+
+    pages: List[Dict[str, Any]] = [
+        _make_page(i, text) for i, text in enumerate(page_texts, start=1)
+    ]
 
     num_pages = len(pages)
     legible = _assess_legibility(page_texts)
@@ -93,17 +153,15 @@ def _process_image(file_bytes: bytes) -> Dict[str, Any]:
         - num_images = 1
         - OCR text extracted via Tesseract
     """
+    from PIL import Image
+
+    pytesseract = _configure_tesseract()
     image = Image.open(io.BytesIO(file_bytes)).convert("RGB")
 
     # OCR using Tesseract
     ocr_text = pytesseract.image_to_string(image) or ""
 
-    pages = [
-        {
-            "page_num": 1,
-            "text": ocr_text,
-        }
-    ]
+    pages = [_make_page(1, ocr_text)]
 
     legible = _assess_legibility([ocr_text])
 
@@ -115,31 +173,62 @@ def _process_image(file_bytes: bytes) -> Dict[str, Any]:
     }
 
 
+def _file_kind(name: str) -> str:
+    if name.endswith(".pdf"):
+        return "pdf"
+    if any(name.endswith(ext) for ext in (".png", ".jpg", ".jpeg")):
+        return "image"
+    return "other"
+
+
+def _process_bytes(file_bytes: bytes, kind: str) -> Dict[str, Any]:
+    if kind == "pdf":
+        return _process_pdf(file_bytes)
+    if kind == "image":
+        return _process_image(file_bytes)
+
+    # Fallback: try image path first, then treat as zero-page doc
+    try:
+        return _process_image(file_bytes)
+    except Exception:
+        return {
+            "num_pages": 0,
+            "num_images": 0,
+            "legible": False,
+            "pages": [],
+        }
+
+
+def _process_by_hash(file_hash: str, file_bytes: bytes, kind: str) -> Dict[str, Any]:
+    """Parse a file once per content hash; Streamlit reruns reuse the result."""
+    key = (file_hash, kind)
+    with _PROCESSED_LOCK:
+        if key in _PROCESSED:
+            _PROCESSED.move_to_end(key)
+            return _PROCESSED[key]
+
+    info = _process_bytes(file_bytes, kind)
+
+    with _PROCESSED_LOCK:
+        _PROCESSED[key] = info
+        while len(_PROCESSED) > PROCESSED_CACHE_SIZE:
+            _PROCESSED.popitem(last=False)
+    return info
+
+
 def process_file(uploaded_file) -> Dict[str, Any]:
     """Accepts a Streamlit UploadedFile and returns a normalized doc_info dict.
 
     This is the single entrypoint used by the Streamlit app. It supports:
       - PDFs (multi-page, text + embedded images)
       - Standalone images (PNG / JPG / JPEG) via OCR
+
+    Results are cached by SHA-256 of the file contents, so re-uploads and
+    reruns on the same file skip PDF parsing / OCR.
     """
     file_bytes = uploaded_file.read()
-    name = uploaded_file.name.lower()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    info = _process_by_hash(file_hash, file_bytes, _file_kind(uploaded_file.name.lower()))
 
-    if name.endswith(".pdf"):
-        info = _process_pdf(file_bytes)
-    elif any(name.endswith(ext) for ext in (".png", ".jpg", ".jpeg")):
-        info = _process_image(file_bytes)
-    else:
-        # Fallback: try image path first, then treat as zero-page doc
-        try:
-            info = _process_image(file_bytes)
-        except Exception:
-            info = {
-                "num_pages": 0,
-                "num_images": 0,
-                "legible": False,
-                "pages": [],
-            }
-
-    info["filename"] = uploaded_file.name
-    return info
+    # Copy so the cached entry never carries a caller's filename
+    return {**info, "filename": uploaded_file.name}
@@ -0,0 +1,139 @@
+# backend/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from .config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS
+
+"""
+Exact-match response cache for OpenRouter chat calls
+----------------------------------------------------
+Classification prompts are deterministic (same model, same system prompt,
+same payload, low temperature), so re-running a document returns the stored
+completion instead of paying another network round-trip.
+"""
+
+
+def _normalize(value: str) -> str:
+    return unicodedata.normalize("NFC", value or "")
+
+
+def hash_request(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    response_format_json: bool,
+) -> str:
+    """Stable SHA-256 key over everything that influences the completion."""
+    key_material = json.dumps(
+        {
+            "model": _normalize(model),
+            "system_prompt": _normalize(system_prompt),
+            "user_prompt": _normalize(user_prompt),
+            "temperature": round(float(temperature), 4),
+            "response_format_json": bool(response_format_json),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class Cache:
+    """SQLite-backed key -> raw completion store with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Streamlit runs classifications from worker threads; one shared
+        # connection guarded by a lock keeps this simple.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, "
+            "response BLOB, "
+            "created_at INTEGER, "
+            "expires_at INTEGER, "
+            "accessed_at INTEGER)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = int(time.time())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        if isinstance(response, bytes):
+            response = response.decode("utf-8")
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        now = int(time.time())
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, response, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response.encode("utf-8"), now, expires_at, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self, now: int) -> None:
+        """Drop expired rows, then keep only the most recently used entries."""
+        self._conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,),
+        )
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid NOT IN ("
+                "SELECT rowid FROM entries ORDER BY accessed_at DESC, rowid DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """Process-wide cache instance, opened on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = Cache()
+    return _cache
@@ -1,31 +1,98 @@
 # backend/llm_client.py
+from __future__ import annotations
+
+import asyncio
 import os
-import requests
-from typing import Any, Dict, Optional
-import json
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+import orjson
 import streamlit as st
 
 from dotenv import load_dotenv
 
+from .config import (
+    LLM_BACKOFF_CAP_SECONDS,
+    LLM_CACHE_ENABLED,
+    LLM_CONNECT_TIMEOUT,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_READ_TIMEOUT,
+    LLM_READ_TIMEOUT_LARGE,
+    LLM_RETRY_STATUS_CODES,
+)
+from .llm_cache import get_cache, hash_request
+
+if TYPE_CHECKING:
+    import httpx
+
 # Load environment variables from .env at project root
 load_dotenv()
 
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+# Caps in-flight OpenRouter requests across all worker threads
+_REQUEST_SLOTS = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
 
-def call_openrouter_chat(
+# One keep-alive HTTP/2 client shared by every call and thread, so we pay the
+# TCP + TLS handshake once and concurrent requests multiplex on one connection.
+# Created (and httpx imported) on first use to keep app startup light.
+_CLIENT: Optional[httpx.Client] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    import httpx
+
+    return {
+        "http2": True,
+        "timeout": httpx.Timeout(LLM_READ_TIMEOUT_LARGE, connect=LLM_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+        ),
+    }
+
+
+def _get_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                import httpx
+
+                _CLIENT = httpx.Client(**_client_options())
+    return _CLIENT
+
+
+def default_timeout(model: str) -> Tuple[float, float]:
+    """(connect, read) timeout: short for small models, long for 70B."""
+    read = LLM_READ_TIMEOUT_LARGE if "70b" in model.lower() else LLM_READ_TIMEOUT
+    return (LLM_CONNECT_TIMEOUT, read)
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """Exponential backoff with jitter, honoring a numeric Retry-After header."""
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_BACKOFF_CAP_SECONDS)
+        except ValueError:
+            pass
+    return min(2 ** attempt + random.random(), LLM_BACKOFF_CAP_SECONDS)
+
+
+def _build_request(
     model: str,
     system_prompt: str,
     user_prompt: str,
-    response_format_json: bool = False,
-    temperature: float = 0.7,
-) -> Dict[str, Any]:
-    """
-    Thin wrapper around OpenRouter chat/completions.
-    Returns either parsed JSON (if response_format_json=True) or raw string.
-    """
-
-    
+    response_format_json: bool,
+    temperature: float,
+) -> Tuple[Dict[str, str], bytes]:
+    """Headers and serialized JSON body for one chat/completions call."""
     # 🔍 DEBUG: see exactly what we got from the environment
     api_key = st.secrets["OPENROUTER_API_KEY"] #ADD YOUR OWN API KEY
     print("[DEBUG] OPENROUTER_API_KEY from env:",(api_key))
@@ -58,24 +125,208 @@ def call_openrouter_chat(
     if response_format_json:
         payload["response_format"] = {"type": "json_object"}
 
-    resp = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=60)
+    # Serialize once; the user prompt is already a large JSON string
+    return headers, orjson.dumps(payload)
+
 
+def _request_timeout(model: str, timeout: Optional[Tuple[float, float]]) -> httpx.Timeout:
+    import httpx
+
+    if timeout is None:
+        timeout = default_timeout(model)
+    connect_timeout, read_timeout = timeout
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+def _retry_after_status(resp: httpx.Response, attempt: int, max_retries: int) -> Optional[str]:
+    """Log the response; return the Retry-After value ("" if absent) when it should be retried."""
     # 🔍 DEBUG: log status + first part of body before raising
     print("[DEBUG] OpenRouter status:", resp.status_code)
     print("[DEBUG] OpenRouter raw response (start):", resp.text[:300])
 
+    if resp.status_code not in LLM_RETRY_STATUS_CODES or attempt >= max_retries:
+        return None
+    print(f"[OpenRouter RETRY] status {resp.status_code} on attempt {attempt + 1}")
+    return resp.headers.get("Retry-After", "")
+
+
+def _finish_response(
+    resp: httpx.Response, cache_key: str, use_cache: bool, response_format_json: bool
+) -> Dict[str, Any]:
+    import httpx
+
     try:
         resp.raise_for_status()
-    except requests.HTTPError as e:
+    except httpx.HTTPStatusError:
         # Print server message to your terminal for easier debugging
         print("[OpenRouter ERROR]", resp.status_code, resp.text)
         raise
 
-    data = resp.json()
+    data = orjson.loads(resp.content)
     content = data["choices"][0]["message"]["content"]
+    parsed = _parse_content(content, response_format_json)
+
+    # Only store completions that parsed cleanly, so a malformed reply is retried next time
+    if use_cache:
+        get_cache().set(cache_key, content)
+
+    return parsed
+
+
+def _cached_response(
+    cache_key: str, model: str, use_cache: bool, response_format_json: bool
+) -> Optional[Dict[str, Any]]:
+    if not use_cache:
+        return None
+    cached = get_cache().get(cache_key)
+    if cached is None:
+        return None
+    print("[LLM cache] hit for model:", model)
+    return _parse_content(cached, response_format_json)
+
+
+def call_openrouter_chat(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    response_format_json: bool = False,
+    temperature: float = 0.7,
+    use_cache: bool = LLM_CACHE_ENABLED,
+    max_retries: int = LLM_MAX_RETRIES,
+    timeout: Optional[Tuple[float, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Thin wrapper around OpenRouter chat/completions.
+    Returns either parsed JSON (if response_format_json=True) or raw string.
+
+    Identical requests are served from the exact-match response cache
+    (see backend/llm_cache.py) unless use_cache=False. Throttling (429),
+    5xx responses and connection errors are retried up to max_retries times
+    with exponential backoff. timeout is (connect, read) seconds and defaults
+    per model via default_timeout().
+    """
+
+    cache_key = hash_request(model, system_prompt, user_prompt, temperature, response_format_json)
+    cached = _cached_response(cache_key, model, use_cache, response_format_json)
+    if cached is not None:
+        return cached
+
+    import httpx
+
+    client = _get_client()
+    headers, body = _build_request(model, system_prompt, user_prompt, response_format_json, temperature)
+    request_timeout = _request_timeout(model, timeout)
+
+    for attempt in range(max_retries + 1):
+        try:
+            # Hold a slot only while the request is in flight, not while backing off
+            with _REQUEST_SLOTS:
+                resp = client.post(
+                    OPENROUTER_URL, headers=headers, content=body, timeout=request_timeout
+                )
+        except httpx.TransportError as e:
+            if attempt >= max_retries:
+                raise
+            print(f"[OpenRouter RETRY] {type(e).__name__} on attempt {attempt + 1}")
+            retry_after = None
+        else:
+            retry_after = _retry_after_status(resp, attempt, max_retries)
+            if retry_after is None:
+                break
+
+        time.sleep(_retry_delay(attempt, retry_after))
+
+    return _finish_response(resp, cache_key, use_cache, response_format_json)
+
+
+# ---------------------------------------------------------------------------
+# Async variant (asyncio + httpx.AsyncClient)
+# ---------------------------------------------------------------------------
+# httpx.AsyncClient and asyncio.Semaphore are bound to one event loop, so they
+# live in a session opened inside the loop rather than at module level.
+_ASYNC_SESSION: ContextVar[Optional[Tuple[httpx.AsyncClient, asyncio.Semaphore]]] = ContextVar(
+    "openrouter_async_session", default=None
+)
+
+
+@asynccontextmanager
+async def async_session():
+    """Shared HTTP/2 client + request semaphore for a batch of async calls.
+
+    Usage:
+        async with async_session():
+            await asyncio.gather(*(a_classify_document(d) for d in docs))
+    """
+    import httpx
+
+    client = httpx.AsyncClient(**_client_options())
+    token = _ASYNC_SESSION.set((client, asyncio.Semaphore(LLM_MAX_CONCURRENCY)))
+    try:
+        yield
+    finally:
+        _ASYNC_SESSION.reset(token)
+        await client.aclose()
+
+
+async def a_call_openrouter_chat(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    response_format_json: bool = False,
+    temperature: float = 0.7,
+    use_cache: bool = LLM_CACHE_ENABLED,
+    max_retries: int = LLM_MAX_RETRIES,
+    timeout: Optional[Tuple[float, float]] = None,
+) -> Dict[str, Any]:
+    """Async twin of call_openrouter_chat (same caching, retries and timeouts).
+
+    Uses the client from the surrounding async_session(); opens a one-off
+    session when called outside of one.
+    """
+    session = _ASYNC_SESSION.get()
+    if session is None:
+        async with async_session():
+            return await a_call_openrouter_chat(
+                model, system_prompt, user_prompt, response_format_json,
+                temperature, use_cache, max_retries, timeout,
+            )
+    client, slots = session
+
+    import httpx
+
+    # SQLite cache lookups/stores run in a worker thread, off the event loop
+    cache_key = hash_request(model, system_prompt, user_prompt, temperature, response_format_json)
+    cached = await asyncio.to_thread(_cached_response, cache_key, model, use_cache, response_format_json)
+    if cached is not None:
+        return cached
+
+    headers, body = _build_request(model, system_prompt, user_prompt, response_format_json, temperature)
+    request_timeout = _request_timeout(model, timeout)
+
+    for attempt in range(max_retries + 1):
+        try:
+            async with slots:
+                resp = await client.post(
+                    OPENROUTER_URL, headers=headers, content=body, timeout=request_timeout
+                )
+        except httpx.TransportError as e:
+            if attempt >= max_retries:
+                raise
+            print(f"[OpenRouter RETRY] {type(e).__name__} on attempt {attempt + 1}")
+            retry_after = None
+        else:
+            retry_after = _retry_after_status(resp, attempt, max_retries)
+            if retry_after is None:
+                break
+
+        await asyncio.sleep(_retry_delay(attempt, retry_after))
+
+    return await asyncio.to_thread(_finish_response, resp, cache_key, use_cache, response_format_json)
+
 
+def _parse_content(content: str, response_format_json: bool) -> Dict[str, Any]:
     if response_format_json:
         # The model is instructed to return JSON only
-        return json.loads(content)
+        return orjson.loads(content)
 
     return {"raw": content}
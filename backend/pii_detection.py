@@ -1,7 +1,7 @@
 # backend/pii_detection.py
 
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 """
 PII detection logic for RegDoc Classifier
@@ -33,36 +33,42 @@ ADDRESS_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
-
 # === Helper: detect business vs. personal emails ===
 
+# Local-part prefixes of shared, public-facing mailboxes (str.startswith takes a tuple)
+BUSINESS_EMAIL_PREFIXES = (
+    "info",
+    "contact",
+    "support",
+    "sales",
+    "help",
+    "team",
+    "hello",
+    "admin",
+    "office",
+    "service",
+)
+
+
 def is_business_email(email: str) -> bool:
     """Heuristically identify non-personal, public-facing email addresses."""
-    email = email.lower().strip()
-    local_part = email.split("@")[0]
-    return any(
-        local_part.startswith(prefix)
-        for prefix in [
-            "info",
-            "contact",
-            "support",
-            "sales",
-            "help",
-            "team",
-            "hello",
-            "admin",
-            "office",
-            "service",
-        ]
-    )
+    local_part = email.lower().strip().split("@", 1)[0]
+    return local_part.startswith(BUSINESS_EMAIL_PREFIXES)
 
 
 # === Main Detection Function ===
 
-def find_pii(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def find_pii(
+    pages: List[Dict[str, Any]],
+    suppress_business_emails: bool = False,
+    business_contacts: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
     """
     Scans all pages and returns structured PII findings.
 
+    With suppress_business_emails=True, public business addresses are left
+    out of the result; pass a list as business_contacts to collect them.
+
     Each finding: {
         "type": "email" | "phone" | "ssn" | "credit_card" | "address",
         "value": "...",
@@ -77,51 +83,68 @@ def find_pii(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         page_num = page.get("page_num", -1)
         text = (page.get("text") or "").strip()
 
+        # Each type gets its own pass: one merged alternation cannot report
+        # overlapping matches, so a digit run spanning two adjacent numbers
+        # (common in PDF tables) would hide the SSN or phone behind it.
+
         # === Email ===
-        for email in EMAIL_PATTERN.findall(text):
-            results.append({
+        for match in EMAIL_PATTERN.finditer(text):
+            value = match.group(0)
+            finding = {
                 "type": "email",
-                "value": email,
+                "value": value,
                 "page": page_num,
-                "is_business": is_business_email(email)
-            })
+                "is_business": is_business_email(value),
+            }
+            if finding["is_business"] and suppress_business_emails:
+                if business_contacts is not None:
+                    business_contacts.append(finding)
+                continue
+            results.append(finding)
 
         # === Phone ===
-        for phone in PHONE_PATTERN.findall(text):
-            # phone is a tuple due to capture groups; join into string
-            clean_phone = " ".join([p for p in phone if p]).strip()
+        number_spans: List[Tuple[int, int]] = []
+        for match in PHONE_PATTERN.finditer(text):
+            number_spans.append(match.span())
             results.append({
                 "type": "phone",
-                "value": clean_phone,
+                "value": match.group(0).strip(),
                 "page": page_num
             })
 
         # === SSN ===
-        for ssn in SSN_PATTERN.findall(text):
+        for match in SSN_PATTERN.finditer(text):
+            number_spans.append(match.span())
             results.append({
                 "type": "ssn",
-                "value": ssn,
+                "value": match.group(0),
                 "page": page_num
             })
 
         # === Credit Card ===
-        for cc in CREDIT_CARD_PATTERN.findall(text):
+        for match in CREDIT_CARD_PATTERN.finditer(text):
+            start, end = match.span()
+            # A "card" that runs into the middle of a phone/SSN is two adjacent
+            # numbers glued together, not a card (a phone-shaped prefix of a
+            # real card is contained in it, so it does not count)
+            if any(
+                s < end and start < e and not (start <= s and e <= end)
+                for s, e in number_spans
+            ):
+                continue
             results.append({
                 "type": "credit_card",
-                "value": cc.strip(),
+                "value": match.group(0).strip(),
                 "page": page_num
             })
 
         # === Address ===
-        for addr in ADDRESS_PATTERN.findall(text):
-            # Since we used capture groups, re-run search to extract full match
-            for match in re.finditer(ADDRESS_PATTERN, text):
-                results.append({
-                    "type": "address",
-                    "value": match.group(0),
-                    "page": page_num
-                })
-            break  # avoid duplicate address per page
+        for match in ADDRESS_PATTERN.finditer(text):
+            results.append({
+                "type": "address",
+                "value": match.group(0),
+                "page": page_num
+            })
 
     return results
 
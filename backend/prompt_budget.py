@@ -0,0 +1,102 @@
+# backend/prompt_budget.py
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from .config import PROMPT_MAX_TOKENS, PROMPT_PAGE_CHAR_LIMIT, PROMPT_SKIM_PAGE_THRESHOLD
+
+"""
+Token budget for the page summaries sent to the LLM
+---------------------------------------------------
+Long PDFs would otherwise send every page (800 chars each) to the model,
+blowing past provider TPM limits and dominating latency and cost.
+
+Selection is deterministic so the same document always produces the same
+prompt (and therefore hits the LLM response cache).
+"""
+
+# Fraction of the budget spent on leading pages before sampling the rest
+_HEAD_SHARE = 2 / 3
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Missing package or no network to fetch the BPE file
+        print(f"[Prompt] WARNING: tiktoken unavailable ({type(e).__name__}); estimating tokens from length.")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _summarize_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    text = (page.get("text") or "").strip()
+    if len(text) > PROMPT_PAGE_CHAR_LIMIT:
+        text = text[:PROMPT_PAGE_CHAR_LIMIT] + "..."
+    return {"page": page["page_num"], "text": text}
+
+
+def _skim(summaries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """First 3, middle 3 and last 2 pages of a very long document."""
+    n = len(summaries)
+    mid = n // 2
+    keep = sorted({*range(3), *range(mid - 1, mid + 2), n - 2, n - 1})
+    return [summaries[i] for i in keep]
+
+
+def _evenly_spaced(items: List[Any], k: int) -> List[Any]:
+    """k items spread across the list, always including the last one."""
+    if k >= len(items):
+        return list(items)
+    if k <= 1:
+        return items[-1:]
+    step = (len(items) - 1) / (k - 1)
+    return [items[round(i * step)] for i in range(k)]
+
+
+def fit_page_summaries(
+    pages: List[Dict[str, Any]],
+    max_tokens: int = PROMPT_MAX_TOKENS,
+    skim_threshold: int = PROMPT_SKIM_PAGE_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """Per-page summaries that fit in max_tokens, in page order.
+
+    Leading pages are kept in order until ~2/3 of the budget is used; the
+    rest of the budget goes to pages sampled evenly from the remainder so
+    the end of the document is still represented.
+    """
+    summaries = [_summarize_page(p) for p in pages]
+    if len(summaries) > skim_threshold:
+        summaries = _skim(summaries)
+
+    costs = [count_tokens(s["text"]) for s in summaries]
+    if sum(costs) <= max_tokens:
+        return summaries
+
+    head_budget = int(max_tokens * _HEAD_SHARE)
+    used = 0
+    head_count = 0
+    for cost in costs:
+        if used + cost > head_budget:
+            break
+        used += cost
+        head_count += 1
+
+    remaining = list(range(head_count, len(summaries)))
+    picked: List[int] = []
+    # Shrink the sample until it fits what is left of the budget
+    for k in range(len(remaining), 0, -1):
+        sample = _evenly_spaced(remaining, k)
+        if used + sum(costs[i] for i in sample) <= max_tokens:
+            picked = sample
+            break
+
+    return summaries[:head_count] + [summaries[i] for i in picked]
@@ -1,6 +1,15 @@
 # backend/safety.py
 
-from typing import List, Dict, Any
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Set, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional: fall back to one compiled regex per bucket
+    ahocorasick = None
 
 # Only very explicit, truly harmful phrases for "unsafe"
 UNSAFE_KEYWORDS = [
@@ -38,32 +47,58 @@ PROFANITY_WORDS = [
     "asshole",
     "dickhead",
     "bastard",
-    "Cunt"
+    "cunt",
 ]
 
 
-def naive_unsafe_check(pages: List[Dict[str, Any]]) -> bool:
-    """
-    Return True only for clearly dangerous/illegal content,
-    NOT just swearing. This feeds the 'unsafe' flag and
-    can upgrade the category to include 'Unsafe'.
-    """
-    text = " ".join((p.get("text") or "") for p in pages).lower()
-    return any(kw in text for kw in UNSAFE_KEYWORDS)
+# --- Policy wording (TC3–TC5) ---------------------------------------------------
 
+# Matched as whole words
+INTERNAL_POLICY_TERMS = [
+    "internal use",
+    "restricted circulation",
+    "proposal",
+    "confidential memo",
+    "research",
+]
+
+TEMPLATE_POLICY_TERMS = [
+    "template",
+    "editable",
+    "shared",
+]
+
+# Matched anywhere in the text
+EQUIPMENT_POLICY_TERMS = [
+    "fighter",
+    "aircraft",
+    "drone",
+    "missile",
+]
+
+# Public-facing material: relaxes the equipment/template rules
+MARKETING_TERMS = [
+    "brochure",
+    "marketing",
+    "customer story",
+    "press release",
+    "product portfolio",
+    "case study",
+    "advertisement",
+]
+
+# Makes a shared/editable template operationally sensitive
+OPERATIONAL_TERMS = [
+    "flight",
+    "manual",
+    "operations",
+    "safety",
+]
+
+# "f-22", "serial no." etc. need a pattern; these literals only trigger it
+_EQUIPMENT_POLICY_TRIGGERS = ["f-", "serial"]
+_EQUIPMENT_POLICY_RE = re.compile(r"(f-\d+|serial\s?(no\.|number|#))")
 
-def profanity_pages(pages: List[Dict[str, Any]]) -> List[int]:
-    """
-    Return list of page numbers that contain strong profanity.
-    We use this to mark kid_safe = False, but we do NOT automatically
-    mark the document as 'Unsafe' just because of profanity.
-    """
-    prof_pages: List[int] = []
-    for p in pages:
-        text = (p.get("text") or "").lower()
-        if any(word in text for word in PROFANITY_WORDS):
-            prof_pages.append(p["page_num"])
-    return prof_pages
 
 # --- Sensitive equipment / aircraft heuristic ---------------------------------
 
@@ -92,6 +127,270 @@ PART_SERIAL_TERMS = [
     "tail number",
 ]
 
+
+# --- Normalization ---------------------------------------------------------------
+
+def _normalize_terms(terms) -> Tuple[str, ...]:
+    return tuple(t.lower() for t in terms)
+
+
+# Pages are matched in lowercase, so the keyword lists are too (once, at import)
+UNSAFE_KEYWORDS = _normalize_terms(UNSAFE_KEYWORDS)
+PROFANITY_WORDS = _normalize_terms(PROFANITY_WORDS)
+INTERNAL_POLICY_TERMS = _normalize_terms(INTERNAL_POLICY_TERMS)
+TEMPLATE_POLICY_TERMS = _normalize_terms(TEMPLATE_POLICY_TERMS)
+EQUIPMENT_POLICY_TERMS = _normalize_terms(EQUIPMENT_POLICY_TERMS)
+MARKETING_TERMS = _normalize_terms(MARKETING_TERMS)
+OPERATIONAL_TERMS = _normalize_terms(OPERATIONAL_TERMS)
+SENSITIVE_EQUIPMENT_KEYWORDS = _normalize_terms(SENSITIVE_EQUIPMENT_KEYWORDS)
+PART_SERIAL_TERMS = _normalize_terms(PART_SERIAL_TERMS)
+_EQUIPMENT_POLICY_TRIGGERS = _normalize_terms(_EQUIPMENT_POLICY_TRIGGERS)
+
+
+# --- Single-pass keyword automaton ------------------------------------------------
+
+# bucket -> (keywords, whole_words_only)
+_KEYWORD_BUCKETS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "unsafe": (UNSAFE_KEYWORDS, False),
+    "internal": (INTERNAL_POLICY_TERMS, True),
+    "template": (TEMPLATE_POLICY_TERMS, True),
+    "equipment": (EQUIPMENT_POLICY_TERMS, False),
+    "equipment_trigger": (_EQUIPMENT_POLICY_TRIGGERS, False),
+    "marketing": (MARKETING_TERMS, False),
+    "operational": (OPERATIONAL_TERMS, False),
+    "sensitive_equipment": (SENSITIVE_EQUIPMENT_KEYWORDS, False),
+    "part_serial": (PART_SERIAL_TERMS, False),
+}
+
+
+def _build_automaton() -> "ahocorasick.Automaton":
+    """One Aho-Corasick automaton over every keyword list, tagged by bucket."""
+    buckets_by_word: Dict[str, List[Tuple[str, bool]]] = {}
+    for bucket, (keywords, whole_words) in _KEYWORD_BUCKETS.items():
+        for kw in keywords:
+            buckets_by_word.setdefault(kw, []).append((bucket, whole_words))
+
+    automaton = ahocorasick.Automaton()
+    for word, buckets in buckets_by_word.items():
+        automaton.add_word(word, (len(word), tuple(buckets)))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_bucket_patterns() -> Dict[str, "re.Pattern[str]"]:
+    """Fallback without pyahocorasick: one alternation per bucket, so each
+    bucket is still a single C-level scan of the page."""
+    patterns = {}
+    for bucket, (keywords, whole_words) in _KEYWORD_BUCKETS.items():
+        alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        if whole_words:
+            alternation = rf"\b(?:{alternation})\b"
+        patterns[bucket] = re.compile(alternation)
+    return patterns
+
+
+if ahocorasick is not None:
+    _AUTOMATON = _build_automaton()
+    _BUCKET_PATTERNS: Dict[str, "re.Pattern[str]"] = {}
+else:
+    print("[Safety] WARNING: pyahocorasick not installed; using regex keyword matching.")
+    _AUTOMATON = None
+    _BUCKET_PATTERNS = _build_bucket_patterns()
+
+# Pages shorter than the shortest keyword cannot match anything
+_MIN_KEYWORD_LEN = min(
+    min(len(k) for k in PROFANITY_WORDS),
+    min(len(k) for keywords, _ in _KEYWORD_BUCKETS.values() for k in keywords),
+)
+_MIN_UNSAFE_LEN = min(len(k) for k in UNSAFE_KEYWORDS)
+
+# Profanity is word-level: the page's word tokens (\w+, so curly quotes, em
+# dashes and other Unicode punctuation separate words too) are looked up in a
+# set, so e.g. "Scunthorpe" or "bitchen" never count.
+_WORD_RE = re.compile(r"\w+")
+_PROFANITY_SET = frozenset(PROFANITY_WORDS)
+# Substring sieve: a page can only contain a profane token if it contains one of
+# these roots ("fuck" covers "fucking", "motherfucker", ...). Most pages contain
+# none, so the translate + split is skipped for them.
+_PROFANITY_ROOTS = tuple(
+    w for w in PROFANITY_WORDS if not any(o != w and o in w for o in PROFANITY_WORDS)
+)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """Regex-style word boundaries around text[start:end + 1]."""
+    before_ok = start == 0 or not _is_word_char(text[start - 1])
+    after_ok = end + 1 >= len(text) or not _is_word_char(text[end + 1])
+    return before_ok and after_ok
+
+
+def _keyword_buckets(text: str) -> Set[str]:
+    """Buckets with at least one keyword hit in (lowercased) text."""
+    if _AUTOMATON is None:
+        return {bucket for bucket, pattern in _BUCKET_PATTERNS.items() if pattern.search(text)}
+
+    page_hits: Set[str] = set()
+    for end, (length, buckets) in _AUTOMATON.iter(text):
+        start = end - length + 1
+        for bucket, whole_words in buckets:
+            if bucket in page_hits:
+                continue
+            if whole_words and not _is_whole_word(text, start, end):
+                continue
+            page_hits.add(bucket)
+    return page_hits
+
+
+def _has_unsafe(text: str) -> bool:
+    """Like "unsafe" in _keyword_buckets(text), but stops at the first hit."""
+    if len(text) < _MIN_UNSAFE_LEN:
+        return False
+    if _AUTOMATON is None:
+        return _BUCKET_PATTERNS["unsafe"].search(text) is not None
+    for _, (_, buckets) in _AUTOMATON.iter(text):
+        if any(bucket == "unsafe" for bucket, _ in buckets):
+            return True
+    return False
+
+
+# Scan results by content hash, so re-uploads / re-classifications of the same
+# text skip the keyword pass entirely
+SCAN_CACHE_SIZE = 1024
+_SCANNED: "OrderedDict[str, Dict[str, List[int]]]" = OrderedDict()
+_SCANNED_LOCK = threading.Lock()
+
+
+def _pages_digest(pages: List[Dict[str, Any]]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in pages:
+        h.update(f"{p['page_num']}\0".encode("utf-8"))
+        h.update(p["text_lower"].encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _scan_pages_cached(pages: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """_scan_pages behind a content-hash LRU. Treat the result as read-only."""
+    key = _pages_digest(pages)
+    with _SCANNED_LOCK:
+        if key in _SCANNED:
+            _SCANNED.move_to_end(key)
+            return _SCANNED[key]
+
+    hits = _scan_pages(pages)
+
+    with _SCANNED_LOCK:
+        _SCANNED[key] = hits
+        while len(_SCANNED) > SCAN_CACHE_SIZE:
+            _SCANNED.popitem(last=False)
+    return hits
+
+
+def _scan_pages(pages: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Run the keyword matcher once over each page's lowercased text and return
+    {bucket: [page_num, ...]} for every bucket that matched.
+
+    Derived buckets: "equipment" also covers pattern hits such as "F-22" or
+    "serial no.", and "sensitive_pages" lists pages with both aircraft /
+    equipment wording and part or serial identifiers.
+    """
+    hits: Dict[str, List[int]] = {}
+
+    for p in pages:
+        text = p["text_lower"]
+        if len(text) < _MIN_KEYWORD_LEN:
+            continue
+
+        page_hits = _keyword_buckets(text)
+        if any(root in text for root in _PROFANITY_ROOTS) and not _PROFANITY_SET.isdisjoint(
+            _WORD_RE.findall(text)
+        ):
+            page_hits.add("profanity")
+        if (
+            "equipment" not in page_hits
+            and "equipment_trigger" in page_hits
+            and _EQUIPMENT_POLICY_RE.search(text)
+        ):
+            page_hits.add("equipment")
+        if "sensitive_equipment" in page_hits and "part_serial" in page_hits:
+            page_hits.add("sensitive_pages")
+
+        for bucket in page_hits:
+            hits.setdefault(bucket, []).append(p["page_num"])
+
+    return hits
+
+
+def _with_text_lower(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pages as given when ingestion already set text_lower; otherwise
+    shallow copies with it added (plain {"page_num", "text"} pages)."""
+    if all("text_lower" in p for p in pages):
+        return pages
+    return [
+        p if "text_lower" in p else {**p, "text_lower": (p.get("text") or "").lower()}
+        for p in pages
+    ]
+
+
+def classify_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Every safety / policy keyword check in one pass per page.
+
+    Uses the "text_lower" set once at ingestion (plain "text" pages are
+    lowercased here instead); the document is never joined into one string.
+
+    Returns:
+        {
+            "unsafe": bool,                  # any UNSAFE_KEYWORDS hit
+            "profanity_pages": [int, ...],   # pages with strong profanity
+            "sensitive_pages": [int, ...],   # aircraft/equipment + part/serial wording
+            "policies": {"internal": bool, "template": bool, "equipment": bool},
+            "marketing": bool,               # any MARKETING_TERMS hit
+            "operational": bool,             # any OPERATIONAL_TERMS hit
+        }
+    """
+    hits = _scan_pages_cached(_with_text_lower(pages))
+    return {
+        "unsafe": "unsafe" in hits,
+        # copies: the cached lists must not be mutated by callers
+        "profanity_pages": list(hits.get("profanity", [])),
+        "sensitive_pages": list(hits.get("sensitive_pages", [])),
+        "policies": {
+            "internal": "internal" in hits,
+            "template": "template" in hits,
+            "equipment": "equipment" in hits,
+        },
+        "marketing": "marketing" in hits,
+        "operational": "operational" in hits,
+    }
+
+
+def naive_unsafe_check(pages: List[Dict[str, Any]]) -> bool:
+    """
+    Return True only for clearly dangerous/illegal content,
+    NOT just swearing. This feeds the 'unsafe' flag and
+    can upgrade the category to include 'Unsafe'.
+
+    Stops at the first page with a hit instead of scanning every bucket
+    of every page.
+    """
+    return any(_has_unsafe(p["text_lower"]) for p in _with_text_lower(pages))
+
+
+def profanity_pages(pages: List[Dict[str, Any]]) -> List[int]:
+    """
+    Return list of page numbers that contain strong profanity.
+    We use this to mark kid_safe = False, but we do NOT automatically
+    mark the document as 'Unsafe' just because of profanity.
+    """
+    return classify_pages(pages)["profanity_pages"]
+
+
 def sensitive_equipment_pages(pages: List[Dict[str, Any]]) -> List[int]:
     """
     Returns pages whose OCR'd text suggests diagrams of military aircraft /
@@ -100,15 +399,4 @@ def sensitive_equipment_pages(pages: List[Dict[str, Any]]) -> List[int]:
     This is a lightweight stand-in for 'image reasoning' based on text
     overlays extracted from images.
     """
-    hits: List[int] = []
-    for p in pages:
-        text = (p.get("text") or "").lower()
-        if not text:
-            continue
-
-        has_aircraft = any(k in text for k in SENSITIVE_EQUIPMENT_KEYWORDS)
-        has_serial_or_parts = any(t in text for t in PART_SERIAL_TERMS)
-
-        if has_aircraft and has_serial_or_parts:
-            hits.append(p["page_num"])
-    return hits
\ No newline at end of file
+    return classify_pages(pages)["sensitive_pages"]
@@ -0,0 +1,142 @@
+# backend/semantic_cache.py
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    SEMANTIC_CACHE_DIR,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+
+"""
+Semantic cache over LLM verdicts
+--------------------------------
+Embeds the page summaries sent to the LLM and, when a previously classified
+document is close enough (cosine similarity >= threshold), reuses its verdict
+instead of calling the model again.
+
+Each page summary is embedded separately (the model truncates long inputs,
+so one joined string would only compare the first page) and the page
+vectors are mean-pooled into one document vector. Only the verdict itself
+is reused; reasoning and citations belong to the other document.
+
+Optional: requires `sentence-transformers` and `faiss-cpu`. If either is
+missing, or the model cannot be loaded, the cache is disabled and
+classification always calls the LLM.
+Threshold guidance: 0.85 is lenient, 0.95 is strict.
+"""
+
+CACHED_FIELDS = ("category", "unsafe", "kid_safe", "confidence")
+
+
+def build_embed_texts(user_payload: Dict[str, Any]) -> List[str]:
+    """One text per page summary (context flags are matched exactly, not embedded)."""
+    texts = [p.get("text", "") for p in user_payload.get("page_summaries", [])]
+    return [t for t in texts if t.strip()] or [""]
+
+
+class SemanticCache:
+    """FAISS inner-product index over L2-normalized sentence embeddings."""
+
+    def __init__(
+        self,
+        cache_dir: str = SEMANTIC_CACHE_DIR,
+        model_name: str = SEMANTIC_CACHE_MODEL,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+    ) -> None:
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self._faiss = faiss
+        self.threshold = threshold
+        self.cache_dir = os.path.abspath(cache_dir)
+        # v2: pooled per-page vectors (v1 embedded one joined string)
+        self.index_path = os.path.join(self.cache_dir, "index.v2.faiss")
+        self.meta_path = os.path.join(self.cache_dir, "entries.v2.jsonl")
+        self._lock = threading.Lock()
+
+        self._model = SentenceTransformer(model_name)
+        dim = self._model.get_sentence_embedding_dimension()
+
+        self._entries: List[Dict[str, Any]] = []
+        if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
+            self._index = faiss.read_index(self.index_path)
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self._entries = [json.loads(line) for line in f if line.strip()]
+            if self._index.ntotal != len(self._entries) or self._index.d != dim:
+                # Out of sync (e.g. crash mid-write or model change): start over
+                self._index = faiss.IndexFlatIP(dim)
+                self._entries = []
+        else:
+            self._index = faiss.IndexFlatIP(dim)
+
+    def embed(self, texts: List[str]):
+        """Mean of the L2-normalized page embeddings, normalized again."""
+        page_vecs = self._model.encode(
+            texts, convert_to_numpy=True, normalize_embeddings=True
+        ).astype("float32")
+        vec = page_vecs.mean(axis=0, keepdims=True)
+        self._faiss.normalize_L2(vec)
+        return vec
+
+    def search(self, vector, context_flags: Dict[str, bool], k: int = 5) -> Optional[Dict[str, Any]]:
+        """Return the closest cached verdict above threshold with identical flags."""
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(vector, min(k, self._index.ntotal))
+            for score, idx in zip(scores[0], ids[0]):
+                if idx < 0 or score < self.threshold:
+                    break
+                entry = self._entries[idx]
+                if entry.get("flags") == context_flags:
+                    print(f"[SemanticCache] hit (similarity={float(score):.3f})")
+                    result = {k: entry["result"].get(k) for k in CACHED_FIELDS}
+                    result["reasoning"] = (
+                        f"Semantic cache hit (similarity {float(score):.2f}): verdict reused "
+                        "from a previously classified, similar document."
+                    )
+                    result["citations"] = []
+                    return result
+        return None
+
+    def add(self, vector, context_flags: Dict[str, bool], result: Dict[str, Any]) -> None:
+        entry = {
+            "flags": context_flags,
+            "result": {k: result.get(k) for k in CACHED_FIELDS},
+        }
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._index.add(vector)
+            self._entries.append(entry)
+            self._faiss.write_index(self._index, self.index_path)
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_failed = False
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide semantic cache, or None if disabled/unavailable."""
+    global _semantic_cache, _semantic_cache_failed
+    if not SEMANTIC_CACHE_ENABLED or _semantic_cache_failed:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None and not _semantic_cache_failed:
+                try:
+                    _semantic_cache = SemanticCache()
+                except Exception as e:
+                    # Missing packages, or model download/load failure (e.g. offline)
+                    _semantic_cache_failed = True
+                    print(
+                        f"[SemanticCache] WARNING: unavailable ({type(e).__name__}: {e}). "
+                        "Semantic cache disabled."
+                    )
+    return _semantic_cache
@@ -1,24 +1,197 @@
 # backend/storage.py
-import json
+import atexit
 import os
-from datetime import datetime
-from typing import Any, Dict, List
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
-# history.json in project root
-HISTORY_PATH = os.path.join(os.path.dirname(__file__), "..", "history.json")
+import orjson
 
+from .config import HISTORY_FLUSH_INTERVAL_SECONDS, HISTORY_FLUSH_MAX_ENTRIES
 
-def load_history() -> List[Dict[str, Any]]:
-    """Load the full audit trail from disk."""
-    path = os.path.abspath(HISTORY_PATH)
-    if not os.path.exists(path):
-        return []
+# Project root, resolved once at import
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# history.jsonl in project root: one JSON entry per line, append-only
+HISTORY_PATH = os.path.join(_ROOT, "history.jsonl")
+
+# Pre-JSONL audit log (a single JSON array); converted on first access
+LEGACY_HISTORY_PATH = os.path.join(_ROOT, "history.json")
+
+# Entries (and flush requests) waiting for the background flusher; only the
+# flusher thread writes, so entries reach disk in the order they were saved
+_queue: "queue.Queue[Any]" = queue.Queue()
+# Serializes writes and guards the append-mode fd (opened once, on first write)
+_write_lock = threading.Lock()
+_fd: Optional[int] = None
+# Entries whose write failed; retried (ahead of newer entries) on the next write
+_unwritten: List[Dict[str, Any]] = []
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+# In-memory mirror of the log: read from disk on the first full load, then kept
+# current by save_result, so later loads never re-read or re-parse the file
+_history: Optional[List[Dict[str, Any]]] = None
+_history_lock = threading.Lock()
+
+
+def _migrate_legacy_history() -> None:
+    """Rewrite an old history.json as history.jsonl, once.
+
+    Callers hold _write_lock, so the flusher cannot append to history.jsonl
+    while it is being created here.
+    """
+    if not os.path.exists(LEGACY_HISTORY_PATH) or os.path.exists(HISTORY_PATH):
+        return
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(LEGACY_HISTORY_PATH, "rb") as f:
+            entries = orjson.loads(f.read())
     except Exception:
-        # if file is corrupted, start fresh
+        # unreadable legacy file: leave it alone and start a fresh log
+        return
+    # write aside and rename, so an interrupted migration leaves no partial log
+    tmp_path = HISTORY_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in entries))
+    os.replace(tmp_path, HISTORY_PATH)
+    try:
+        os.remove(LEGACY_HISTORY_PATH)
+    except FileNotFoundError:
+        pass
+
+
+class _FlushRequest:
+    """Queued by flush_history; the flusher writes everything before it, then signals."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+def _write_entries(entries: List[Dict[str, Any]]) -> Optional[Exception]:
+    """Append earlier failures plus entries with a single write call.
+
+    On failure the entries are kept for the next attempt and the error is
+    returned (the flusher thread has nobody to raise it to).
+    """
+    global _fd, _unwritten
+    with _write_lock:
+        pending = _unwritten + entries
+        if not pending:
+            return None
+        try:
+            blob = b"".join(orjson.dumps(entry) + b"\n" for entry in pending)
+            if _fd is None:
+                _migrate_legacy_history()
+                _fd = os.open(HISTORY_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            view = memoryview(blob)
+            while view:
+                written = os.write(_fd, view)
+                view = view[written:]
+        except Exception as e:
+            _unwritten = pending
+            print(f"[Storage] ERROR: could not write {len(pending)} history entries (will retry): {e}")
+            return e
+        _unwritten = []
+        return None
+
+
+def _flush_loop() -> None:
+    """Wait for an entry, gather whatever else arrives shortly after, write once.
+
+    A flush request ends the batch early so its caller is not kept waiting.
+    """
+    while True:
+        items = [_queue.get()]
+        deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL_SECONDS
+        while len(items) < HISTORY_FLUSH_MAX_ENTRIES and not isinstance(items[-1], _FlushRequest):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        entries = [item for item in items if not isinstance(item, _FlushRequest)]
+        error = _write_entries(entries)
+        for item in items:
+            if isinstance(item, _FlushRequest):
+                item.error = error
+                item.done.set()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = threading.Thread(
+                    target=_flush_loop, name="history-flusher", daemon=True
+                )
+                _flusher.start()
+
+
+def _request_flush() -> Optional[Exception]:
+    """Have the flusher write everything queued so far; return its error, if any."""
+    if _flusher is None:
+        # nothing was ever queued in this process
+        return None
+    request = _FlushRequest()
+    _queue.put(request)
+    request.done.wait()
+    return request.error
+
+
+def flush_history() -> None:
+    """Block until every saved entry is on disk (Save handler and shutdown call this).
+
+    Raises OSError if entries could not be written; they stay queued for retry.
+    """
+    error = _request_flush()
+    if error is not None:
+        raise OSError(f"Audit log entries could not be written to {HISTORY_PATH}: {error}") from error
+
+
+atexit.register(flush_history)
+
+
+def _read_history_file(tail: Optional[int] = None) -> List[Dict[str, Any]]:
+    # Readers still get what is on disk if a write failed (already logged)
+    _request_flush()
+    with _write_lock:
+        _migrate_legacy_history()
+    if not os.path.exists(HISTORY_PATH):
         return []
+    history: List[Dict[str, Any]] = []
+    with open(HISTORY_PATH, "rb") as f:
+        # deque(maxlen=K) keeps only the last K raw lines; only those are parsed
+        lines = deque(f, maxlen=tail) if tail is not None else f
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                history.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                # skip a corrupted (e.g. half-written) line, keep the rest
+                continue
+    return history
+
+
+def load_history(tail: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Load the audit trail (only the last `tail` entries if given)."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            if tail is not None:
+                # Not mirrored yet: parse just the tail rather than the whole file
+                return _read_history_file(tail)
+            _history = _read_history_file()
+        if tail is None:
+            return list(_history)
+        return _history[-tail:] if tail > 0 else []
 
 
 def save_result(
@@ -28,9 +201,12 @@ def save_result(
     final_category: str,
     reviewer_comment: str = "",
 ) -> None:
-    """Append a single classification + review entry to the audit log."""
-    history = load_history()
+    """Queue a single classification + review entry for the audit log.
 
+    Returns immediately; the entry is visible to load_history at once and the
+    background flusher appends it to disk within HISTORY_FLUSH_INTERVAL_SECONDS.
+    Call flush_history() to wait for the write and surface errors.
+    """
     entry = {
         "filename": filename,
         "pages": doc_info.get("num_pages"),
@@ -40,12 +216,29 @@ def save_result(
         "unsafe": ai_result.get("unsafe"),
         "kid_safe": ai_result.get("kid_safe"),
         "confidence": ai_result.get("confidence"),
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         "reviewer_comment": reviewer_comment,
     }
 
-    history.append(entry)
+    _ensure_flusher()
+    with _history_lock:
+        if _history is not None:
+            _history.append(entry)
+        _queue.put(entry)
+
 
-    path = os.path.abspath(HISTORY_PATH)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2)
+def clear_history() -> None:
+    """Delete the audit trail (and any unmigrated legacy file)."""
+    global _fd, _history, _unwritten
+    with _history_lock:
+        _request_flush()
+        with _write_lock:
+            # entries still failing to write are part of the history being cleared
+            _unwritten = []
+            if _fd is not None:
+                os.close(_fd)
+                _fd = None
+            for path in (HISTORY_PATH, LEGACY_HISTORY_PATH):
+                if os.path.exists(path):
+                    os.remove(path)
+        _history = []
@@ -0,0 +1,37 @@
+# tests/test_pii_detection.py
+import unittest
+
+from backend.pii_detection import find_pii
+
+
+def _types(text):
+    return [(f["type"], f["value"]) for f in find_pii([{"page_num": 1, "text": text}])]
+
+
+class AdjacentNumbersTest(unittest.TestCase):
+    """Numbers printed side by side (e.g. PDF table cells) must not merge."""
+
+    def test_phone_then_ssn(self):
+        found = _types("Phone: 555-123-4567 123-45-6789")
+        self.assertIn(("phone", "555-123-4567"), found)
+        self.assertIn(("ssn", "123-45-6789"), found)
+        self.assertNotIn("credit_card", [t for t, _ in found])
+
+    def test_ssn_then_phone(self):
+        found = _types("123-45-6789 555-123-4567")
+        self.assertIn(("ssn", "123-45-6789"), found)
+        self.assertNotIn("credit_card", [t for t, _ in found])
+
+    def test_two_phones(self):
+        found = _types("call 555-123-4567 555-987-6543")
+        self.assertEqual(
+            found, [("phone", "555-123-4567"), ("phone", "555-987-6543")]
+        )
+
+    def test_real_card_still_detected(self):
+        self.assertIn(("credit_card", "4111 1111 1111 1111"), _types("card 4111 1111 1111 1111"))
+        self.assertIn(("credit_card", "4111111111111111"), _types("4111111111111111"))
+
+
+if __name__ == "__main__":
+    unittest.main()
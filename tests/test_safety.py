@@ -0,0 +1,23 @@
+# tests/test_safety.py
+import unittest
+
+from backend.safety import profanity_pages
+
+
+def _flagged(text):
+    return profanity_pages([{"page_num": 1, "text": text}]) == [1]
+
+
+class ProfanityTokensTest(unittest.TestCase):
+    def test_unicode_punctuation_separates_words(self):
+        self.assertTrue(_flagged("He said “fuck” loudly"))
+        self.assertTrue(_flagged("What the fuck’s going on"))
+        self.assertTrue(_flagged("this is shit—really"))
+
+    def test_embedded_substrings_do_not_count(self):
+        self.assertFalse(_flagged("bitchen"))
+        self.assertFalse(_flagged("Scunthorpe"))
+
+
+if __name__ == "__main__":
+    unittest.main()